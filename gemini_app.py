@@ -1,11 +1,24 @@
 import streamlit as st
 import google.generativeai as genai
+from google.generativeai import caching
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential, wait_random
 import subprocess
 import tempfile
+import shutil
 import os
-import mimetypes
-from datetime import datetime
-import yt_dlp
+import json
+import re
+import asyncio
+import glob
+import hashlib
+import functools
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import toml
 
 # Load configuration from TOML file
@@ -27,74 +40,415 @@ if not GEMINI_API_KEY:
     st.error("❌ GEMINI_API_KEY not found in config.toml. Please check your configuration.")
     st.stop()
 
-genai.configure(api_key=GEMINI_API_KEY)
+@st.cache_resource
+def configure_gemini(api_key):
+    """Configure the Gemini client once per process"""
+    genai.configure(api_key=api_key)
+
+@st.cache_resource
+def get_model(name):
+    """Get a Gemini model handle that persists across Streamlit reruns"""
+    return genai.GenerativeModel(name)
+
+configure_gemini(GEMINI_API_KEY)
+
+TRANSCRIBE_PROMPT = "Please transcribe this audio file accurately. Return only the transcribed text without any additional commentary or formatting."
+
+# Audio longer than this is split into segments that are transcribed concurrently
+# (concurrency can be lowered with the GEMINI_MAX_CONCURRENT environment variable)
+LONG_AUDIO_SECONDS = 15 * 60
+SEGMENT_SECONDS = 10 * 60
+MAX_CONCURRENT_REQUESTS = int(os.getenv('GEMINI_MAX_CONCURRENT', '8'))
+
+# Segment cuts move to the nearest silence within this many seconds of each boundary
+SPLIT_SEARCH_SECONDS = 30
+MIN_SEGMENT_SECONDS = 1
+SILENCE_DETECT_FILTER = 'silencedetect=noise=-40dB:d=0.25'
+SILENCE_RE = re.compile(r'silence_start: (-?[\d.]+).*?silence_end: (-?[\d.]+)', re.S)
+
+# Audio larger than this is re-encoded to low-bitrate speech quality before upload
+COMPRESS_MIN_BYTES = 5 * 1024 * 1024
+
+# Silences over 1 second are cut down to 0.3 seconds when re-encoding, since Gemini bills audio by duration
+SILENCE_FILTER = 'silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-50dB:stop_silence=0.3'
+
+# Streamed responses and download progress are re-rendered at most this often (in seconds)
+STREAM_RENDER_INTERVAL = 0.2
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Transcripts are also stored on disk, keyed on audio hash and model, for this many days
+# (override with the TRANSCRIPT_CACHE_TTL_DAYS environment variable)
+TRANSCRIPT_CACHE_DIR = os.path.join(os.getcwd(), "cache")
+TRANSCRIPT_CACHE_TTL_SECONDS = float(os.getenv('TRANSCRIPT_CACHE_TTL_DAYS', '30')) * 24 * 3600
+
+# Uploaded audio is reused by content hash until shortly before Gemini expires it after 48 hours
+FILE_REGISTRY_PATH = os.path.join(os.getcwd(), "gemini_file_registry.json")
+FILE_REGISTRY_TTL_SECONDS = 47 * 3600
+
+# In-memory transcription and processing results are kept for at most this many entries and seconds
+# (shorter than the registry TTL, since cached results include the upload's file name)
+RESULT_CACHE_MAX_ENTRIES = 32
+RESULT_CACHE_TTL_SECONDS = 24 * 3600
+
+# Model used for text processing, and the minimum transcript size the context cache API accepts
+PROCESSING_MODEL = 'gemini-2.0-flash'
+MIN_CACHED_CONTENT_TOKENS = 2048
+
+# Session state keys used by the results view and their initial values
+SESSION_DEFAULTS = {
+    'transcript': None,
+    'processed_text': None,
+    'task': 'summarize',
+    'target_language': 'English',
+    'filename': '',
+    'reading_mode': False,
+    'gemini_file_name': None,
+    'audio_sha': None,
+    'generated_at': None,
+}
+
+# Number of characters of the download content shown in the Download tab preview
+DOWNLOAD_PREVIEW_CHARS = 2000
+
+# Sections marked with **...** become headers in reading mode
+BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+
+# Reading mode styles, only emitted while reading mode is active
+READING_CSS = """
+<style>
+.reading-mode {
+    max-width: 100%;
+    margin: 0;
+    padding: 80px 40px 40px 40px;
+    line-height: 1.8;
+    font-size: 18px;
+    font-family: 'Charter', 'Georgia', serif;
+    color: #292929;
+    background: #ffffff;
+    min-height: 100vh;
+    position: fixed;
+    top: 0;
+    left: 0;
+    right: 0;
+    bottom: 0;
+    z-index: 999;
+    overflow-y: auto;
+    box-sizing: border-box;
+}
+
+.reading-mode h1, .reading-mode h2, .reading-mode h3 {
+    font-family: 'SF Pro Display', -apple-system, BlinkMacSystemFont, sans-serif;
+    font-weight: 600;
+    margin-top: 2em;
+    margin-bottom: 0.5em;
+    color: #242424;
+}
+
+.reading-mode h1 {
+    font-size: 32px;
+    margin-bottom: 16px;
+}
+
+.reading-mode h2 {
+    font-size: 24px;
+    margin-bottom: 12px;
+}
+
+.reading-mode p {
+    margin-bottom: 1.5em;
+    text-align: justify;
+}
+
+.reading-mode ul, .reading-mode ol {
+    margin-bottom: 1.5em;
+    padding-left: 1.5em;
+}
+
+.reading-mode li {
+    margin-bottom: 0.5em;
+}
+
+.reading-mode blockquote {
+    border-left: 3px solid #e6e6e6;
+    margin: 1.5em 0;
+    padding-left: 1.5em;
+    font-style: italic;
+    color: #6b6b6b;
+}
+
+.reading-mode-button {
+    background: #1a73e8;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 20px;
+    font-size: 14px;
+    cursor: pointer;
+    margin-bottom: 20px;
+    transition: background-color 0.3s;
+}
+
+.reading-mode-button:hover {
+    background: #1557b0;
+}
+
+.exit-reading-mode {
+    text-align: center;
+    margin-bottom: 20px;
+    position: sticky;
+    top: 0;
+    background: #ffffff;
+    padding: 20px 0;
+    border-bottom: 1px solid #e0e0e0;
+    z-index: 1001;
+}
+
+.exit-reading-mode button {
+    background: #f8f9fa;
+    color: #5f6368;
+    border: 1px solid #dadce0;
+    padding: 12px 24px;
+    border-radius: 6px;
+    cursor: pointer;
+    font-size: 16px;
+    font-weight: 500;
+    transition: all 0.2s ease;
+}
+
+.exit-reading-mode button:hover {
+    background: #e8f0fe;
+    border-color: #1a73e8;
+    color: #1a73e8;
+}
+
+/* Hide Streamlit elements in reading mode */
+.reading-mode-active .stMainBlockContainer {
+    padding: 0;
+}
+
+.reading-mode-active .stAppHeader {
+    display: none;
+}
+
+.reading-mode-content {
+    max-width: 800px;
+    margin: 0 auto;
+    padding: 0 40px;
+}
+
+/* Hide ALL Streamlit UI elements except sidebar */
+.stApp > header,
+header[data-testid="stHeader"],
+.stDeployButton,
+[data-testid="stToolbar"],
+[data-testid="stDecoration"],
+#MainMenu,
+footer,
+.viewerBadge_container__1QSob,
+.styles_viewerBadge__1yB5_ {
+    display: none !important;
+    visibility: hidden !important;
+    opacity: 0 !important;
+    height: 0 !important;
+    overflow: hidden !important;
+}
+
+/* Hide any element containing "Deploy" text */
+*:has-text("Deploy") {
+    display: none !important;
+}
+
+/* Keep sidebar visible in reading mode */
+.stSidebar {
+    display: block !important;
+    z-index: 1000 !important;
+}
+
+/* Style the main content area */
+[data-testid="stMain"] {
+    padding-left: 0 !important;
+}
+</style>
+"""
+
+MIME_MAP = {
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.flac': 'audio/flac',
+    '.ogg': 'audio/ogg',
+    # Containers YouTube serves audio-only streams in; WebM is not a Gemini audio type,
+    # so it is always re-encoded to Ogg before upload and this entry is only a fallback
+    '.webm': 'audio/webm',
+    '.opus': 'audio/ogg'
+}
+
+# Formats that are re-encoded before upload regardless of size
+REENCODE_EXTENSIONS = {'.webm'}
 
 def get_mime_type(audio_path):
     """Get MIME type for audio file"""
-    mime_type, _ = mimetypes.guess_type(audio_path)
-    if mime_type and mime_type.startswith('audio/'):
-        return mime_type
-    
-    # Default fallback based on file extension
     ext = os.path.splitext(audio_path)[1].lower()
-    mime_map = {
-        '.mp3': 'audio/mpeg',
-        '.wav': 'audio/wav',
-        '.m4a': 'audio/mp4',
-        '.aac': 'audio/aac',
-        '.flac': 'audio/flac',
-        '.ogg': 'audio/ogg'
-    }
-    return mime_map.get(ext, 'audio/wav')
+    return MIME_MAP.get(ext, 'audio/wav')
+
+# Retry Gemini calls on rate limits and transient server errors, with jittered exponential backoff
+gemini_retry = retry(
+    retry=retry_if_exception_type((
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+    )),
+    wait=wait_exponential(multiplier=1, max=30) + wait_random(0, 0.5),
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+
+@gemini_retry
+def upload_file(audio_path):
+    """Upload an audio file to Gemini"""
+    return genai.upload_file(path=audio_path, mime_type=get_mime_type(audio_path))
 
-def transcribe_with_gemini(audio_path):
-    """Transcribe audio using Gemini API"""
+@gemini_retry
+def generate_content(model, contents, **kwargs):
+    """Generate content with Gemini"""
+    return model.generate_content(contents, **kwargs)
+
+@st.cache_resource
+def get_file_registry_lock():
+    """Lock serializing reads and writes of the file registry across sessions"""
+    return threading.Lock()
+
+def load_file_registry():
+    """Load the registry of reusable Gemini uploads, dropping expired entries"""
+    try:
+        with open(FILE_REGISTRY_PATH, encoding='utf-8') as f:
+            registry = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {audio_sha: entry for audio_sha, entry in registry.items() if entry.get('expires_at', 0) > now}
+
+def register_uploaded_file(audio_sha, file_name):
+    """Record an upload in the file registry, sweeping expired entries"""
+    with get_file_registry_lock():
+        registry = load_file_registry()
+        registry[audio_sha] = {'name': file_name, 'expires_at': time.time() + FILE_REGISTRY_TTL_SECONDS}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(FILE_REGISTRY_PATH), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(registry, f)
+            os.replace(tmp_path, FILE_REGISTRY_PATH)
+        except OSError:
+            pass
+
+def registered_file_name(audio_sha):
+    """Name of the unexpired Gemini upload recorded for an audio hash, or None"""
+    with get_file_registry_lock():
+        entry = load_file_registry().get(audio_sha)
+    return entry['name'] if entry else None
+
+def get_or_upload_audio(audio_sha, audio_path):
+    """Get the Gemini upload for an audio hash, uploading a compressed copy if there is none"""
+    file_name = registered_file_name(audio_sha)
+    if file_name:
+        try:
+            return genai.get_file(file_name)
+        except Exception:
+            # Deleted or expired on the Gemini side; upload again
+            pass
+    
+    with prepared_audio(audio_path) as upload_path:
+        uploaded_file = upload_file(upload_path)
+    register_uploaded_file(audio_sha, uploaded_file.name)
+    return uploaded_file
+
+def stream_response(response, placeholder):
+    """Render a streamed Gemini response into a placeholder as it arrives and return the full text"""
+    chunks = []
+    last_render = 0.0
+    for chunk in response:
+        chunks.append(chunk.text)
+        # Re-joining and re-rendering the whole text is O(n) per update, so refresh at a fixed rate
+        now = time.monotonic()
+        if now - last_render >= STREAM_RENDER_INTERVAL:
+            placeholder.markdown("".join(chunks))
+            last_render = now
+    text = "".join(chunks)
+    placeholder.markdown(text)
+    return text
+
+def transcribe_with_gemini(file_name, placeholder=None):
+    """Transcribe audio already uploaded to Gemini under the given file name
+    
+    When a placeholder is given, the transcript is streamed into it as it is generated.
+    """
     try:
         # Initialize Gemini model
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        
-        # Get MIME type for the audio file
-        mime_type = get_mime_type(audio_path)
+        model = get_model(GEMINI_MODEL)
         
-        # Upload audio file
-        uploaded_file = genai.upload_file(path=audio_path, mime_type=mime_type)
+        # Reference the existing upload
+        uploaded_file = genai.get_file(file_name)
         
         # Generate transcription
-        response = model.generate_content([
-            "Please transcribe this audio file accurately. Return only the transcribed text without any additional commentary or formatting.",
-            uploaded_file
-        ])
-        
-        # Clean up uploaded file
-        genai.delete_file(uploaded_file.name)
-        
-        return response.text
+        response = generate_content(model, [TRANSCRIBE_PROMPT, uploaded_file], stream=placeholder is not None)
+        return stream_response(response, placeholder) if placeholder else response.text
     
     except Exception as e:
         st.error(f"Error transcribing with Gemini: {e}")
         return None
 
-def process_with_gemini(text, task="summarize", target_language="English"):
-    """Process text using Gemini API"""
+def get_transcript_cache(text):
+    """Get or create a Gemini context cache holding the transcript"""
+    text_sha = hash_text(text)
+    cache_names = st.session_state.setdefault('transcript_caches', {})
+    
+    # A transcript seen before is either too short to cache (None) or has a cache to reuse
+    if text_sha in cache_names:
+        if cache_names[text_sha] is None:
+            return None
+        try:
+            return caching.CachedContent.get(cache_names[text_sha])
+        except Exception:
+            # Expired; the transcript is known to be large enough, so recreate it without recounting
+            pass
+    elif get_model(PROCESSING_MODEL).count_tokens(text).total_tokens < MIN_CACHED_CONTENT_TOKENS:
+        cache_names[text_sha] = None
+        return None
+    
+    cache = caching.CachedContent.create(model=PROCESSING_MODEL, contents=[text], ttl=timedelta(minutes=10))
+    cache_names[text_sha] = cache.name
+    return cache
+
+def process_with_gemini(text, task="summarize", target_language="English", placeholder=None):
+    """Process text using Gemini API
+    
+    When a placeholder is given, the output is streamed into it as it is generated.
+    """
     try:
-        # Initialize Gemini model for processing
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        # Reference the transcript from a context cache when it is large enough
+        try:
+            cache = get_transcript_cache(text)
+        except Exception:
+            cache = None
         
-        # Prepare the prompt based on task and target language
-        if task == "summarize":
-            prompt = f"Please provide a concise summary of the following transcript in {target_language}:\n\n{text}"
-        elif task == "translate":
-            prompt = f"Please translate the following transcript to {target_language}:\n\n{text}"
-        elif task == "analyze":
-            prompt = f"Please analyze the key points and themes in the following transcript in {target_language}:\n\n{text}"
+        if cache:
+            # Only the instruction is sent; the transcript comes from the context cache
+            model = genai.GenerativeModel.from_cached_content(cached_content=cache)
+            prompt = f"Please {get_task_instruction(task, target_language)}."
         else:
-            prompt = f"Please {task} the following transcript in {target_language}:\n\n{text}"
+            # Initialize Gemini model for processing
+            model = get_model(PROCESSING_MODEL)
+            
+            # Prepare the prompt based on task and target language
+            prompt = f"Please {get_task_instruction(task, target_language)}.\n\nTranscript:\n{text}"
         
         # Generate response with Gemini
-        response = model.generate_content(prompt)
+        response = generate_content(model, prompt, stream=placeholder is not None)
+        processed_text = stream_response(response, placeholder) if placeholder else response.text
         
-        if response.text:
-            return response.text.strip()
+        if processed_text:
+            return processed_text.strip()
         else:
             st.error("Gemini returned no text")
             return None
@@ -103,14 +457,421 @@ def process_with_gemini(text, task="summarize", target_language="English"):
         st.error(f"Error processing with Gemini: {e}")
         return None
 
+def get_task_instruction(task, target_language):
+    """Build the processing instruction for a task and target language"""
+    if task == "summarize":
+        return f"provide a concise summary of the transcript in {target_language}"
+    elif task == "translate":
+        return f"translate the transcript to {target_language}"
+    elif task == "analyze":
+        return f"analyze the key points and themes in the transcript in {target_language}"
+    else:
+        return f"{task} the transcript in {target_language}"
+
+def transcribe_and_process(audio_path, task="summarize", target_language="English", audio_sha=None):
+    """Transcribe and process audio in a single Gemini call"""
+    try:
+        # Initialize Gemini model
+        model = get_model(GEMINI_MODEL)
+        
+        # Upload audio file, or reuse an earlier upload of the same audio
+        uploaded_file = get_or_upload_audio(audio_sha or hash_file(audio_path), audio_path)
+        
+        # Ask for both the transcript and the processed output in one structured response
+        prompt = (
+            "Please transcribe this audio file accurately, then "
+            f"{get_task_instruction(task, target_language)}. "
+            "Return a JSON object where \"transcript\" is the verbatim transcription without any additional "
+            "commentary or formatting, and \"processed\" is the result of the requested task."
+        )
+        response = generate_content(
+            model,
+            [prompt, uploaded_file],
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": {
+                    "type": "object",
+                    "properties": {
+                        "transcript": {"type": "string"},
+                        "processed": {"type": "string"},
+                    },
+                    "required": ["transcript", "processed"],
+                },
+            },
+        )
+        
+        result = None
+        if response.candidates[0].finish_reason != genai.protos.Candidate.FinishReason.MAX_TOKENS:
+            try:
+                result = json.loads(response.text)
+            except json.JSONDecodeError:
+                pass
+        
+        if result is None:
+            # Transcript and output together did not fit in one response; give each its own call
+            transcript = transcribe_with_gemini(uploaded_file.name)
+            processed_text = process_with_gemini(transcript, task, target_language) if transcript else None
+            return transcript, processed_text, uploaded_file.name
+        
+        processed_text = (result.get("processed") or "").strip() or None
+        return result.get("transcript"), processed_text, uploaded_file.name
+    
+    except Exception as e:
+        st.error(f"Error transcribing with Gemini: {e}")
+        return None, None, None
+
+def compress_audio(src_path, dst_path):
+    """Re-encode audio to 16 kHz mono Opus at 24 kbps, shortening silent stretches"""
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', src_path,
+         '-af', SILENCE_FILTER, '-ac', '1', '-ar', '16000', '-c:a', 'libopus', '-b:a', '24k', dst_path],
+        capture_output=True,
+        check=True
+    )
+    return dst_path
+
+@contextmanager
+def prepared_audio(audio_path, min_bytes=COMPRESS_MIN_BYTES):
+    """Yield a compressed copy of large or unsupported audio for upload, or the original path"""
+    ext = os.path.splitext(audio_path)[1].lower()
+    if ext not in REENCODE_EXTENSIONS and os.path.getsize(audio_path) <= min_bytes:
+        yield audio_path
+        return
+    
+    with tempfile.TemporaryDirectory() as compressed_dir:
+        compressed_path = os.path.join(compressed_dir, 'audio.ogg')
+        try:
+            compress_audio(audio_path, compressed_path)
+        except (subprocess.CalledProcessError, OSError):
+            # Fall back to uploading the original if ffmpeg is unavailable or fails
+            compressed_path = audio_path
+        yield compressed_path
+
+def get_audio_duration(audio_path):
+    """Get audio duration in seconds with ffprobe, or 0 if it cannot be determined"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return 0
+
+def find_split_point(audio_path, target_seconds):
+    """Return the middle of the silence nearest to a target time, or the target if there is none
+    
+    Only a window of SPLIT_SEARCH_SECONDS either side of the target is decoded.
+    """
+    window_start = max(target_seconds - SPLIT_SEARCH_SECONDS, 0)
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-nostats', '-ss', str(window_start), '-t', str(2 * SPLIT_SEARCH_SECONDS),
+             '-i', audio_path, '-af', SILENCE_DETECT_FILTER, '-f', 'null', '-'],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return target_seconds
+    
+    midpoints = [
+        window_start + (float(start) + float(end)) / 2
+        for start, end in SILENCE_RE.findall(result.stderr)
+    ]
+    return min(midpoints, key=lambda t: abs(t - target_seconds), default=target_seconds)
+
+def split_audio(audio_path, output_dir, segment_seconds=SEGMENT_SECONDS):
+    """Split audio into segments of about segment_seconds with ffmpeg (stream copy, no re-encode)
+    
+    Cuts are moved to nearby silences so no word is split between two segments. Audio
+    with no usable cut (for example, shortened below segment_seconds by silence trimming)
+    is returned whole.
+    """
+    ext = os.path.splitext(audio_path)[1]
+    duration = get_audio_duration(audio_path)
+    if duration:
+        # Keep the last segment at least MIN_SEGMENT_SECONDS long
+        split_points = [
+            find_split_point(audio_path, target)
+            for target in range(segment_seconds, int(duration - MIN_SEGMENT_SECONDS), segment_seconds)
+        ]
+        split_points = [point for point in split_points if point < duration - MIN_SEGMENT_SECONDS]
+        if not split_points:
+            # Without explicit times the segment muxer would fall back to 2-second segments
+            return [audio_path]
+        segment_args = ['-segment_times', ','.join(f'{point:.3f}' for point in split_points)]
+    else:
+        segment_args = ['-segment_time', str(segment_seconds)]
+    
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', audio_path, '-f', 'segment', *segment_args,
+         '-reset_timestamps', '1', '-c', 'copy', os.path.join(output_dir, f'chunk_%03d{ext}')],
+        capture_output=True,
+        check=True
+    )
+    return sorted(glob.glob(os.path.join(output_dir, f'chunk_*{ext}')))
+
+def run_blocking(func, *args):
+    """Run a blocking call on the running loop's default executor (asyncio.to_thread needs Python 3.9)"""
+    return asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+async def transcribe_segment_async(model, audio_path, semaphore, deletions):
+    """Upload and transcribe a single audio segment, holding the shared semaphore
+    
+    Deleting the uploaded segment is queued on ``deletions`` after the semaphore is
+    released, so the next segment can start without waiting on the delete round trip.
+    """
+    async with semaphore:
+        uploaded_file = await run_blocking(upload_file, audio_path)
+        try:
+            # The SDK's async client is bound to the loop it was first used on, and each run
+            # gets a new loop from asyncio.run, so the blocking client is run in a thread instead
+            response = await run_blocking(generate_content, model, [TRANSCRIBE_PROMPT, uploaded_file])
+        finally:
+            deletions.append(run_blocking(genai.delete_file, uploaded_file.name))
+    return response.text.strip()
+
+async def transcribe_segments_async(segment_paths):
+    """Transcribe audio segments concurrently and join them in order"""
+    model = get_model(GEMINI_MODEL)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # The default executor has only cpu_count + 4 threads, which would silently cap concurrency
+    # on small hosts; leave room for every segment call plus the background deletes
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS * 2))
+    deletions = []
+    tasks = [asyncio.create_task(transcribe_segment_async(model, path, semaphore, deletions)) for path in segment_paths]
+    try:
+        transcripts = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather does not cancel the other segments when one fails; stop them so that
+        # every delete they queue is queued before the deletions are awaited below
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        # Segments expire on their own after 48 hours, so a failed delete is not an error
+        await asyncio.gather(*deletions, return_exceptions=True)
+    return "\n\n".join(transcripts)
+
+def transcribe_long_audio(audio_path):
+    """Transcribe long audio by splitting it and transcribing segments in parallel"""
+    try:
+        with tempfile.TemporaryDirectory() as segment_dir:
+            segment_paths = split_audio(audio_path, segment_dir)
+            if not segment_paths:
+                raise Exception("ffmpeg produced no audio segments")
+            return asyncio.run(transcribe_segments_async(segment_paths))
+    
+    except Exception as e:
+        st.error(f"Error transcribing with Gemini: {e}")
+        return None
+
+def hash_file(path):
+    """Compute the SHA-256 of a file without loading it into memory"""
+    with open(path, 'rb') as f:
+        # Python 3.11+ hashes with a reused buffer and releases the GIL
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+        return digest.hexdigest()
+
+def save_uploaded_file(uploaded_file):
+    """Stream an uploaded file to a temporary file in 1 MB chunks, hashing it in the same pass
+    
+    Returns the temporary file path and the SHA-256 of its contents.
+    """
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
+        for block in iter(lambda: uploaded_file.read(1024 * 1024), b''):
+            digest.update(block)
+            tmp_file.write(block)
+    return tmp_file.name, digest.hexdigest()
+
+def hash_text(text):
+    """Compute the SHA-256 of a text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def transcript_cache_path(audio_sha):
+    """Path of the on-disk transcript for an audio hash and the configured model"""
+    key = hashlib.sha256(f"{audio_sha}:{GEMINI_MODEL}".encode('utf-8')).hexdigest()
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{key}.json")
+
+@functools.lru_cache(maxsize=128)
+def read_cached_transcript(path, mtime):
+    """Read an on-disk transcript; keyed on mtime so rewritten entries are reloaded"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['transcript']
+
+def load_cached_transcript(audio_sha):
+    """Get a stored transcript, or None if there is none or it is older than the TTL"""
+    path = transcript_cache_path(audio_sha)
+    try:
+        mtime = os.path.getmtime(path)
+        if time.time() - mtime > TRANSCRIPT_CACHE_TTL_SECONDS:
+            return None
+        return read_cached_transcript(path, mtime)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def save_cached_transcript(audio_sha, transcript):
+    """Store a transcript on disk, replacing any previous entry atomically"""
+    try:
+        os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=TRANSCRIPT_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'model': GEMINI_MODEL, 'transcript': transcript}, f)
+        os.replace(tmp_path, transcript_cache_path(audio_sha))
+        sweep_transcript_cache()
+    except OSError:
+        # The cache is an optimization; failing to write it must not fail the request
+        pass
+
+def sweep_transcript_cache():
+    """Delete stored transcripts older than the TTL"""
+    expired_before = time.time() - TRANSCRIPT_CACHE_TTL_SECONDS
+    with os.scandir(TRANSCRIPT_CACHE_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < expired_before:
+                    os.unlink(entry.path)
+            except OSError:
+                # Already removed by another session
+                pass
+
+# Cached wrappers are keyed on content hashes; underscore-prefixed arguments are not hashed by Streamlit.
+# Failures raise instead of returning None so they are never cached.
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL_SECONDS, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def cached_transcribe_and_process(audio_sha, task, target_language, _audio_path):
+    """Cached transcribe_and_process keyed on the audio content hash"""
+    transcript, processed_text, file_name = transcribe_and_process(_audio_path, task, target_language, audio_sha)
+    if not transcript:
+        raise Exception("Failed to transcribe audio")
+    return transcript, processed_text, file_name
+
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL_SECONDS, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def cached_transcribe_long_audio(audio_sha, _audio_path):
+    """Cached transcribe_long_audio keyed on the audio content hash"""
+    with prepared_audio(_audio_path) as upload_path:
+        transcript = transcribe_long_audio(upload_path)
+    if not transcript:
+        raise Exception("Failed to transcribe audio")
+    return transcript
+
+@st.cache_resource
+def get_processed_cache():
+    """Processed outputs keyed on (transcript hash, task, target language), least recently used first
+    
+    An OrderedDict guarded by a lock rather than st.cache_data, so a cache miss can stream into the page.
+    """
+    return OrderedDict(), threading.Lock()
+
+def get_processed_text(cache_key):
+    """Look up a processed output, marking it as recently used"""
+    processed_cache, lock = get_processed_cache()
+    with lock:
+        processed_text = processed_cache.get(cache_key)
+        if processed_text is not None:
+            processed_cache.move_to_end(cache_key)
+        return processed_text
+
+def store_processed_text(cache_key, processed_text):
+    """Store a processed output, evicting the least recently used beyond RESULT_CACHE_MAX_ENTRIES"""
+    processed_cache, lock = get_processed_cache()
+    with lock:
+        processed_cache[cache_key] = processed_text
+        processed_cache.move_to_end(cache_key)
+        while len(processed_cache) > RESULT_CACHE_MAX_ENTRIES:
+            processed_cache.popitem(last=False)
+
+def load_download_metadata(metadata_path):
+    """Return (filepath, title, duration, audio_sha) for a previous download if its audio is still on disk"""
+    try:
+        with open(metadata_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(metadata.get('filepath', '')):
+        return None
+    # Sidecars written before the hash was recorded fall back to hashing the file
+    audio_sha = metadata.get('audio_sha') or hash_file(metadata['filepath'])
+    return metadata['filepath'], metadata['title'], metadata['duration'], audio_sha
+
+def save_download_metadata(metadata_path, filepath, title, duration, audio_sha):
+    """Write the sidecar that lets a later request reuse a downloaded file"""
+    try:
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump({'filepath': filepath, 'title': title, 'duration': duration, 'audio_sha': audio_sha}, f)
+    except OSError:
+        # The sidecar is an optimization; failing to write it must not fail the download
+        pass
+
+def get_youtube_downloader(download_dir):
+    """Return this session's YoutubeDL for a download directory, creating it on first use
+    
+    Building a YoutubeDL loads every extractor and parses the options, so one instance per
+    directory is kept in session state. Its only progress hook forwards to the callbacks in
+    the returned list, which each download replaces with its own.
+    """
+    downloaders = st.session_state.setdefault('youtube_downloaders', {})
+    if download_dir in downloaders:
+        return downloaders[download_dir]
+    
+    progress_callbacks = []
+    
+    def forward_progress(d):
+        for callback in progress_callbacks:
+            callback(d)
+    
+    # Download without conversion
+    ydl_opts = {
+        'format': 'bestaudio[ext=m4a]/bestaudio[acodec^=opus]/bestaudio',
+        'outtmpl': os.path.join(download_dir, '%(id)s.%(ext)s'),
+        'quiet': True,
+        'no_warnings': True,
+        'progress_hooks': [forward_progress],
+        # Fetch fragments in parallel and in 10 MB ranges to avoid per-connection throttling
+        'concurrent_fragment_downloads': 8,
+        'http_chunk_size': 10 * 1024 * 1024,
+        # Start from a 64 KiB read/write buffer instead of yt-dlp's 1 KiB default
+        'buffersize': 64 * 1024,
+    }
+    
+    # Use aria2c for multi-connection downloads when it is installed
+    if shutil.which('aria2c'):
+        ydl_opts['external_downloader'] = 'aria2c'
+        ydl_opts['external_downloader_args'] = {'aria2c': ['-x', '16', '-s', '16', '-k', '1M']}
+    
+    # yt-dlp loads hundreds of extractor modules, so it is imported only once a URL is submitted
+    import yt_dlp
+    
+    downloaders[download_dir] = yt_dlp.YoutubeDL(ydl_opts), progress_callbacks
+    return downloaders[download_dir]
+
 def download_youtube_audio(youtube_url, progress_bar, status_text):
-    """Download audio from YouTube URL"""
+    """Download audio from YouTube URL, returning its path, title, duration and content hash"""
     # Create downloads folder
     download_dir = os.path.join(os.getcwd(), "downloads")
     os.makedirs(download_dir, exist_ok=True)
     
+    last_update = 0.0
+    
     def progress_hook(d):
+        nonlocal last_update
         if d['status'] == 'downloading':
+            # yt-dlp reports every network chunk; limit UI round trips to about ten per second
+            now = time.monotonic()
+            if now - last_update < PROGRESS_UPDATE_INTERVAL:
+                return
+            last_update = now
             total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
             downloaded = d.get('downloaded_bytes', 0)
             
@@ -124,29 +885,42 @@ def download_youtube_audio(youtube_url, progress_bar, status_text):
             progress_bar.progress(0.3)
             status_text.text("Download complete!")
     
-    # Download without conversion
-    ydl_opts = {
-        'format': 'bestaudio[ext=m4a]/bestaudio/best',
-        'outtmpl': os.path.join(download_dir, '%(title)s.%(ext)s'),
-        'quiet': True,
-        'no_warnings': True,
-        'progress_hooks': [progress_hook],
-    }
+    # A repeated URL is served from disk without contacting YouTube at all
+    url_metadata_path = os.path.join(download_dir, f"url_{hash_text(youtube_url)[:16]}.json")
+    cached = load_download_metadata(url_metadata_path)
+    if cached:
+        progress_bar.progress(0.3)
+        status_text.text("Using previously downloaded audio")
+        return cached
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=True)
-            video_title = info.get('title', 'Unknown')
-            duration = info.get('duration', 0)
-            
-            # Get the actual filename
-            filename = ydl.prepare_filename(info)
-            # Check for m4a extension
-            if not os.path.exists(filename) and os.path.exists(filename.replace('.webm', '.m4a')):
-                filename = filename.replace('.webm', '.m4a')
-            
+        ydl, progress_callbacks = get_youtube_downloader(download_dir)
+        progress_callbacks[:] = [progress_hook]
+        
+        # Resolve the video ID first so other URLs for the same video can skip the download
+        info = ydl.extract_info(youtube_url, download=False)
+        metadata_path = os.path.join(download_dir, f"{info['id']}.json")
+        cached = load_download_metadata(metadata_path)
+        if cached:
+            save_download_metadata(url_metadata_path, *cached)
+            progress_bar.progress(0.3)
+            status_text.text("Using previously downloaded audio")
+            return cached
+        
+        info = ydl.process_ie_result(info, download=True)
+        video_title = info.get('title', 'Unknown')
+        duration = info.get('duration', 0)
+        
+        # Get the actual filename reported by yt-dlp
+        requested_downloads = info.get('requested_downloads') or [{}]
+        filename = requested_downloads[0].get('filepath') or ydl.prepare_filename(info)
+        
         if os.path.exists(filename):
-            return filename, video_title, duration
+            # Record the download so the next request for this video is served from disk
+            audio_sha = hash_file(filename)
+            save_download_metadata(metadata_path, filename, video_title, duration, audio_sha)
+            save_download_metadata(url_metadata_path, filename, video_title, duration, audio_sha)
+            return filename, video_title, duration, audio_sha
         else:
             raise Exception("Failed to download audio")
     except Exception as e:
@@ -154,149 +928,96 @@ def download_youtube_audio(youtube_url, progress_bar, status_text):
 
 def format_duration(seconds):
     """Convert seconds to human-readable format"""
-    if seconds:
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        if hours > 0:
-            return f"{hours}h {minutes}m {secs}s"
-        elif minutes > 0:
-            return f"{minutes}m {secs}s"
-        else:
-            return f"{secs}s"
-    return "Unknown"
+    if not seconds:
+        return "Unknown"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m {secs}s"
+    return f"{minutes}m {secs}s" if minutes else f"{secs}s"
 
-def main():
-    st.set_page_config(
-        page_title="Gemini Transcription & Processing",
-        page_icon="🎙️",
-        layout="wide"
-    )
-    
-    # Add custom CSS for reading mode
-    st.markdown("""
-    <style>
-    .reading-mode {
-        max-width: 100%;
-        margin: 0;
-        padding: 80px 40px 40px 40px;
-        line-height: 1.8;
-        font-size: 18px;
-        font-family: 'Charter', 'Georgia', serif;
-        color: #292929;
-        background: #ffffff;
-        min-height: 100vh;
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        z-index: 999;
-        overflow-y: auto;
-        box-sizing: border-box;
-    }
-    
-    .reading-mode h1, .reading-mode h2, .reading-mode h3 {
-        font-family: 'SF Pro Display', -apple-system, BlinkMacSystemFont, sans-serif;
-        font-weight: 600;
-        margin-top: 2em;
-        margin-bottom: 0.5em;
-        color: #242424;
-    }
-    
-    .reading-mode h1 {
-        font-size: 32px;
-        margin-bottom: 16px;
-    }
-    
-    .reading-mode h2 {
-        font-size: 24px;
-        margin-bottom: 12px;
-    }
-    
-    .reading-mode p {
-        margin-bottom: 1.5em;
-        text-align: justify;
-    }
-    
-    .reading-mode ul, .reading-mode ol {
-        margin-bottom: 1.5em;
-        padding-left: 1.5em;
-    }
-    
-    .reading-mode li {
-        margin-bottom: 0.5em;
-    }
-    
-    .reading-mode blockquote {
-        border-left: 3px solid #e6e6e6;
-        margin: 1.5em 0;
-        padding-left: 1.5em;
-        font-style: italic;
-        color: #6b6b6b;
-    }
-    
-    .reading-mode-button {
-        background: #1a73e8;
-        color: white;
-        border: none;
-        padding: 8px 16px;
-        border-radius: 20px;
-        font-size: 14px;
-        cursor: pointer;
-        margin-bottom: 20px;
-        transition: background-color 0.3s;
-    }
+def process_transcript(transcript, task, target_language):
+    """Process a transcript, streaming the output into the page unless it is already cached"""
+    cache_key = (hash_text(transcript), task, target_language)
+    processed_text = get_processed_text(cache_key)
+    if processed_text is None:
+        placeholder = st.empty()
+        processed_text = process_with_gemini(transcript, task, target_language, placeholder)
+        placeholder.empty()
+        if processed_text:
+            store_processed_text(cache_key, processed_text)
+    return processed_text
+
+def run_transcription(audio_path, duration, task, target_language, progress_bar, status_text, start_progress,
+                      audio_sha=None):
+    """Transcribe and process audio, splitting long audio into parallel segments
     
-    .reading-mode-button:hover {
-        background: #1557b0;
-    }
+    Returns the transcript, the processed text and the name of the reusable Gemini upload (if any).
+    """
+    audio_sha = audio_sha or hash_file(audio_path)
     
-    .exit-reading-mode {
-        text-align: center;
-        margin-bottom: 20px;
-        position: sticky;
-        top: 0;
-        background: #ffffff;
-        padding: 20px 0;
-        border-bottom: 1px solid #e0e0e0;
-        z-index: 1001;
-    }
+    # Audio transcribed before only needs the processing step
+    transcript = load_cached_transcript(audio_sha)
+    if transcript:
+        progress_bar.progress(80)
+        status_text.text("Using saved transcript! Processing with Gemini...")
+        return transcript, process_transcript(transcript, task, target_language), registered_file_name(audio_sha)
     
-    .exit-reading-mode button {
-        background: #f8f9fa;
-        color: #5f6368;
-        border: 1px solid #dadce0;
-        padding: 12px 24px;
-        border-radius: 6px;
-        cursor: pointer;
-        font-size: 16px;
-        font-weight: 500;
-        transition: all 0.2s ease;
-    }
+    if duration > LONG_AUDIO_SECONDS:
+        # Transcribe segments concurrently, then process the joined transcript
+        status_text.text("Transcribing audio segments in parallel with Gemini API...")
+        progress_bar.progress(start_progress)
+        
+        transcript = cached_transcribe_long_audio(audio_sha, audio_path)
+        save_cached_transcript(audio_sha, transcript)
+        
+        progress_bar.progress(80)
+        status_text.text("Transcription completed! Processing with Gemini...")
+        return transcript, process_transcript(transcript, task, target_language), None
     
-    .exit-reading-mode button:hover {
-        background: #e8f0fe;
-        border-color: #1a73e8;
-        color: #1a73e8;
-    }
+    # Transcribe and process with a single Gemini call
+    status_text.text("Transcribing and processing audio with Gemini API...")
+    progress_bar.progress(start_progress)
     
-    /* Hide Streamlit elements in reading mode */
-    .reading-mode-active .stMainBlockContainer {
-        padding: 0;
-    }
+    transcript, processed_text, file_name = cached_transcribe_and_process(audio_sha, task, target_language, audio_path)
+    save_cached_transcript(audio_sha, transcript)
+    # Repeat runs are served from the saved transcript, so record the fused output for them too
+    if processed_text:
+        store_processed_text((hash_text(transcript), task, target_language), processed_text)
+    return transcript, processed_text, file_name
+
+def build_download_content(transcript, processed_text, task, target_language, filename, generated):
+    """Build the downloadable results text"""
+    return f"""Audio Transcription Results
+Generated: {generated}
+Source File: {filename}
+Task: {task.title()} in {target_language}
+
+=== ORIGINAL TRANSCRIPT ===
+{transcript}
+
+=== GEMINI {task.upper()} ({target_language.upper()}) ===
+{processed_text or "Processing failed"}
+"""
+
+def format_reading_content(content):
+    """Convert plain text to reading mode HTML"""
+    formatted_content = content.replace('\n\n', '</p><p>').replace('\n', '<br>')
+    formatted_content = f"<p>{formatted_content}</p>"
     
-    .reading-mode-active .stAppHeader {
-        display: none;
-    }
+    # Add headers for sections marked with **
+    return BOLD_RE.sub(r'<h3>\1</h3>', formatted_content)
+
+def main():
+    st.set_page_config(
+        page_title="Gemini Transcription & Processing",
+        page_icon="🎙️",
+        layout="wide"
+    )
     
-    .reading-mode-content {
-        max-width: 800px;
-        margin: 0 auto;
-        padding: 0 40px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Initialize session state keys once so later reads need no existence checks
+    for key, value in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
     
     st.title("🎙️ Audio Transcription with Gemini")
     st.markdown("Upload an audio file to transcribe and process with Gemini API")
@@ -344,32 +1065,25 @@ def main():
                 st.info(f"File: {uploaded_file.name}")
                 st.info(f"Size: {uploaded_file.size / (1024*1024):.2f} MB")
                 
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    temp_path = tmp_file.name
-                
                 # Process button
                 if st.button("🚀 Transcribe & Process", type="primary", key="upload_process"):
+                    temp_path = None
                     try:
                         # Progress tracking
                         progress_bar = st.progress(0)
                         status_text = st.empty()
                         
-                        # Step 1: Transcribe with Gemini
-                        status_text.text("Transcribing audio with Gemini API...")
-                        progress_bar.progress(25)
+                        # Save uploaded file temporarily, hashing it in the same pass
+                        temp_path, audio_sha = save_uploaded_file(uploaded_file)
                         
-                        transcript = transcribe_with_gemini(temp_path)
+                        # Transcribe and process with Gemini
+                        duration = get_audio_duration(temp_path)
+                        transcript, processed_text, gemini_file_name = run_transcription(
+                            temp_path, duration, task, target_language, progress_bar, status_text,
+                            start_progress=25, audio_sha=audio_sha
+                        )
                         
                         if transcript:
-                            progress_bar.progress(50)
-                            status_text.text("Transcription completed! Processing with Gemini...")
-                            
-                            # Step 2: Process with Gemini
-                            progress_bar.progress(75)
-                            processed_text = process_with_gemini(transcript, task, target_language)
-                            
                             progress_bar.progress(100)
                             status_text.text("Processing completed!")
                             
@@ -378,6 +1092,9 @@ def main():
                             st.session_state.processed_text = processed_text
                             st.session_state.task = task
                             st.session_state.target_language = target_language
+                            st.session_state.gemini_file_name = gemini_file_name
+                            st.session_state.audio_sha = audio_sha
+                            st.session_state.generated_at = datetime.now()
                             st.session_state.filename = uploaded_file.name
                             
                         else:
@@ -388,7 +1105,7 @@ def main():
                     
                     finally:
                         # Clean up temporary file
-                        if os.path.exists(temp_path):
+                        if temp_path and os.path.exists(temp_path):
                             os.unlink(temp_path)
         
         with input_tab2:
@@ -408,21 +1125,19 @@ def main():
                         
                         # Step 1: Download YouTube audio
                         status_text.text("Downloading YouTube audio...")
-                        audio_path, video_title, duration = download_youtube_audio(youtube_url, progress_bar, status_text)
-                        
-                        # Step 2: Transcribe with Gemini
-                        status_text.text("Transcribing audio with Gemini API...")
-                        progress_bar.progress(60)
+                        audio_path, video_title, duration, audio_sha = download_youtube_audio(
+                            youtube_url, progress_bar, status_text
+                        )
                         
-                        transcript = transcribe_with_gemini(audio_path)
+                        # Step 2: Transcribe and process with Gemini
+                        if not duration:
+                            duration = get_audio_duration(audio_path)
+                        transcript, processed_text, gemini_file_name = run_transcription(
+                            audio_path, duration, task, target_language, progress_bar, status_text,
+                            start_progress=60, audio_sha=audio_sha
+                        )
                         
                         if transcript:
-                            progress_bar.progress(80)
-                            status_text.text("Transcription completed! Processing with Gemini...")
-                            
-                            # Step 3: Process with Gemini
-                            processed_text = process_with_gemini(transcript, task, target_language)
-                            
                             progress_bar.progress(100)
                             status_text.text("Processing completed!")
                             
@@ -431,6 +1146,9 @@ def main():
                             st.session_state.processed_text = processed_text
                             st.session_state.task = task
                             st.session_state.target_language = target_language
+                            st.session_state.gemini_file_name = gemini_file_name
+                            st.session_state.audio_sha = audio_sha
+                            st.session_state.generated_at = datetime.now()
                             st.session_state.filename = f"{video_title} ({format_duration(duration)})"
                             
                             # Show video info
@@ -449,50 +1167,15 @@ def main():
         st.header("📝 Results")
         
         # Display results if available
-        if hasattr(st.session_state, 'transcript') and st.session_state.transcript:
+        if st.session_state.transcript:
             
             # Check if reading mode is enabled
-            reading_mode = st.session_state.get('reading_mode', False)
+            reading_mode = st.session_state.reading_mode
             
             if reading_mode:
                 # Reading Mode View
                 # Add custom styles for reading mode
-                st.markdown("""
-                <style>
-                /* Hide ALL Streamlit UI elements except sidebar */
-                .stApp > header,
-                header[data-testid="stHeader"],
-                .stDeployButton,
-                [data-testid="stToolbar"],
-                [data-testid="stDecoration"],
-                #MainMenu,
-                footer,
-                .viewerBadge_container__1QSob,
-                .styles_viewerBadge__1yB5_ {
-                    display: none !important;
-                    visibility: hidden !important;
-                    opacity: 0 !important;
-                    height: 0 !important;
-                    overflow: hidden !important;
-                }
-                
-                /* Hide any element containing "Deploy" text */
-                *:has-text("Deploy") {
-                    display: none !important;
-                }
-                
-                /* Keep sidebar visible in reading mode */
-                .stSidebar {
-                    display: block !important;
-                    z-index: 1000 !important;
-                }
-                
-                /* Style the main content area */
-                [data-testid="stMain"] {
-                    padding-left: 0 !important;
-                }
-                </style>
-                """, unsafe_allow_html=True)
+                st.markdown(READING_CSS, unsafe_allow_html=True)
                 
                 # Add exit button in sidebar
                 with st.sidebar:
@@ -504,19 +1187,14 @@ def main():
                 content = st.session_state.processed_text or st.session_state.transcript
                 
                 # Convert content to HTML with proper formatting
-                formatted_content = content.replace('\n\n', '</p><p>').replace('\n', '<br>')
-                formatted_content = f"<p>{formatted_content}</p>"
-                
-                # Add headers for sections marked with **
-                import re
-                formatted_content = re.sub(r'\*\*(.*?)\*\*', r'<h3>\1</h3>', formatted_content)
+                formatted_content = format_reading_content(content)
                 
                 # Create the full screen reading mode
                 st.markdown(f"""
                 <div class="reading-mode">
                     <div class="reading-mode-content">
-                        <h1>{st.session_state.get('task', 'Summarize').title() if hasattr(st.session_state, 'task') else 'Summarize'} ({st.session_state.get('target_language', 'Thai')})</h1>
-                        <p><em>Source: {st.session_state.get('filename', 'Unknown')}</em></p>
+                        <h1>{st.session_state.task.title()} ({st.session_state.target_language})</h1>
+                        <p><em>Source: {st.session_state.filename}</em></p>
                         {formatted_content}
                     </div>
                 </div>
@@ -529,6 +1207,25 @@ def main():
                 
                 with tab1:
                     st.subheader("Original Transcript")
+                    
+                    # Retranscribe from the audio already uploaded to Gemini
+                    if st.session_state.gemini_file_name:
+                        if st.button("🔄 Retranscribe", key="retranscribe"):
+                            placeholder = st.empty()
+                            transcript = transcribe_with_gemini(st.session_state.gemini_file_name, placeholder)
+                            if transcript:
+                                # Replace the saved transcript so later runs do not bring back the old one,
+                                # and redo the processing that was based on it
+                                save_cached_transcript(st.session_state.audio_sha, transcript)
+                                st.session_state.transcript = transcript
+                                st.session_state.processed_text = process_transcript(
+                                    transcript, st.session_state.task, st.session_state.target_language
+                                )
+                                st.session_state.generated_at = datetime.now()
+                                st.rerun()
+                            else:
+                                st.session_state.gemini_file_name = None
+                    
                     st.text_area(
                         "Transcript from Gemini API",
                         value=st.session_state.transcript,
@@ -560,19 +1257,17 @@ def main():
                     st.subheader("Download Results")
                     
                     # Prepare download content
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    generated_at = st.session_state.generated_at or datetime.now()
+                    timestamp = generated_at.strftime("%Y%m%d_%H%M%S")
                     
-                    download_content = f"""Audio Transcription Results
-Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-Source File: {st.session_state.filename}
-Task: {st.session_state.task.title()} in {st.session_state.target_language}
-
-=== ORIGINAL TRANSCRIPT ===
-{st.session_state.transcript}
-
-=== GEMINI {st.session_state.task.upper()} ({st.session_state.target_language.upper()}) ===
-{st.session_state.processed_text or "Processing failed"}
-"""
+                    download_content = build_download_content(
+                        st.session_state.transcript,
+                        st.session_state.processed_text,
+                        st.session_state.task,
+                        st.session_state.target_language,
+                        st.session_state.filename,
+                        generated_at.strftime("%Y-%m-%d %H:%M:%S")
+                    )
                     
                     st.download_button(
                         label="📥 Download Results",
@@ -582,8 +1277,10 @@ Task: {st.session_state.task.title()} in {st.session_state.target_language}
                         type="primary"
                     )
                     
-                    # Copy to clipboard option
-                    st.code(download_content, language=None)
+                    # Preview only the beginning so long transcripts are not sent to the browser twice
+                    with st.expander("Preview", expanded=False):
+                        preview = download_content[:DOWNLOAD_PREVIEW_CHARS]
+                        st.text(preview + "…" if len(download_content) > DOWNLOAD_PREVIEW_CHARS else preview)
         
         else:
             st.info("Upload an audio file and click 'Transcribe & Process' to see results here.")